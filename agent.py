@@ -1,9 +1,19 @@
 import os
 import re
+import time
 import dspy
+from dspy.clients import DISK_CACHE_DIR
+from dataclasses import dataclass, field
 from typing import List
 from dotenv import load_dotenv
 
+try:
+    # RE2 matches in linear time regardless of input, which matters because
+    # every pattern below runs on attacker-controlled text.
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
 load_dotenv()
 
 # --- 1. SETUP DSPy MODEL ---
@@ -15,6 +25,22 @@ lm = dspy.LM(
 )
 dspy.configure(lm=lm)
 
+# DSPy's LM cache already serves repeated prompts from memory and from disk.
+# Point HONEYPOT_CACHE_DIR at a persistent volume so it survives redeploys.
+dspy.configure_cache(
+    disk_cache_dir=os.environ.get("HONEYPOT_CACHE_DIR", DISK_CACHE_DIR),
+    disk_size_limit_bytes=64 << 20,
+)
+
+# DSPy's cache has no expiry. rollout_id is part of its cache key but is never
+# sent to Groq, so keying it by day means a replayed payload gets a fresh
+# persona reply at least once a day; old entries age out under the size limit.
+REPLY_CACHE_TTL = 86400
+
+
+def reply_config():
+    return {"rollout_id": int(time.time() // REPLY_CACHE_TTL)}
+
 
 # --- 2. DSPy SIGNATURE (The Cognitive Rules) ---
 class GrandpaPersona(dspy.Signature):
@@ -32,6 +58,9 @@ class GrandpaPersona(dspy.Signature):
 
 
 # --- 3. DSPy MODULE (The Execution Engine) ---
+FALLBACK_REPLY = "Oh dear, my internet seems slow. Can you say that again?"
+
+
 class HoneypotAgent(dspy.Module):
     def __init__(self):
         super().__init__()
@@ -42,36 +71,120 @@ class HoneypotAgent(dspy.Module):
         try:
             prediction = self.generate_reply(
                 conversation_history=history_str,
-                latest_message=latest_message
+                latest_message=latest_message,
+                config=reply_config(),
+            )
+            return prediction.reply
+        except Exception as e:
+            print(f"DSPy/Groq Error: {e}")
+            return FALLBACK_REPLY
+
+    async def aforward(self, history: List[str], latest_message: str):
+        history_str = "\n".join(history) if history else "No previous history."
+        try:
+            prediction = await self.generate_reply.acall(
+                conversation_history=history_str,
+                latest_message=latest_message,
+                config=reply_config(),
             )
             return prediction.reply
         except Exception as e:
             print(f"DSPy/Groq Error: {e}")
-            return "Oh dear, my internet seems slow. Can you say that again?"
+            return FALLBACK_REPLY
+
+    async def astream(self, history: List[str], latest_message: str):
+        """Yield the reply in chunks as Groq produces them."""
+        history_str = "\n".join(history) if history else "No previous history."
+
+        # Stream listeners keep per-stream state, so each call gets its own.
+        stream_reply = dspy.streamify(
+            self.generate_reply,
+            stream_listeners=[dspy.streaming.StreamListener(signature_field_name="reply")],
+            is_async_program=True,
+        )
+        streamed = False
+        try:
+            async for part in stream_reply(
+                conversation_history=history_str,
+                latest_message=latest_message,
+                config=reply_config(),
+            ):
+                if isinstance(part, dspy.streaming.StreamResponse):
+                    streamed = True
+                    yield part.chunk
+                elif isinstance(part, dspy.Prediction) and not streamed:
+                    # A DSPy cache hit arrives as a single Prediction with no chunks.
+                    yield part.reply
+        except Exception as e:
+            print(f"DSPy/Groq Error: {e}")
+            if not streamed:
+                yield FALLBACK_REPLY
 
 
 # Instantiate globally
 agent = HoneypotAgent()
 
 
+async def warm_up():
+    """Open the Groq connection ahead of the first message.
+
+    DNS, TLS and client setup are paid at startup instead of on the first
+    scammer's reply. Failures are only reported; the first real call retries.
+    """
+    try:
+        await lm.acall("Hi", max_tokens=1, cache=False)
+    except Exception as e:
+        print(f"DSPy/Groq warm-up failed: {e}")
+
+
 # --- 4. DETERMINISTIC TOOLS ---
+# Compiled once at import; these run on every incoming message. Links and
+# phone numbers share one alternation so the text is scanned for both in a
+# single pass, with the named group telling us which bucket a match goes to.
+# UPI IDs get their own scan: a UPI handle often starts inside what the
+# alternation would already have consumed as a phone number or a link
+# ("+919876543210@ybl", "https://verify@paytm.in").
+# analyze_message truncates its input to MAX_MESSAGE_LENGTH, so these scan a
+# bounded string. RE2 is linear on that already, and a counted repeat would
+# only blow up its DFA; the backtracking stdlib fallback gets the URL repeat
+# bounded to a hostname's length instead.
+if _regex is re:
+    _HOST_CHAR, _DIGIT, _URL_REPEAT = r'[-\w.]', r'\d', '{1,255}'
+else:
+    # RE2's \w and \d are ASCII-only where re's are Unicode; spell the Unicode
+    # classes out so IDN and homograph hosts ("paytm-kyc.рф") are kept whole.
+    _HOST_CHAR, _DIGIT, _URL_REPEAT = r'[-\w\pL\pN.]', r'\p{Nd}', '+'
+_UPI_RE = _regex.compile(r'[a-zA-Z0-9.\-_]{2,256}@[a-zA-Z]{2,64}')
+_LINK_PHONE_RE = _regex.compile(
+    r'(?P<phishingLinks>https?://(?:' + _HOST_CHAR + r'|%[\da-fA-F]{2})' + _URL_REPEAT + ')'
+    r'|(?P<phoneNumbers>(?:\+91[\-\s]?)?[6-9]' + _DIGIT + '{9})'
+)
+
+
 def extract_intelligence(text: str):
-    upi_pattern = r'[a-zA-Z0-9.\-_]{2,256}@[a-zA-Z]{2,64}'
-    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-    phone_pattern = r'(?:\+91[\-\s]?)?[6-9]\d{9}'
-    return {
-        "upiIds": re.findall(upi_pattern, text),
-        "phishingLinks": re.findall(url_pattern, text),
-        "phoneNumbers": re.findall(phone_pattern, text)
-    }
+    intel = {"upiIds": [], "phishingLinks": [], "phoneNumbers": []}
+    # Every indicator needs an '@', a '://' or a leading 6-9 digit; most chat
+    # messages have none of them, and plain substring checks are far cheaper
+    # than running the regex engine.
+    if "@" in text:
+        intel["upiIds"] = _UPI_RE.findall(text)
+    if "://" in text or any(d in text for d in "6789"):
+        for match in _LINK_PHONE_RE.finditer(text):
+            intel[match.lastgroup].append(match.group())
+    # Scammers repeat the same UPI ID or link; report each once, in order seen.
+    return {kind: list(dict.fromkeys(found)) for kind, found in intel.items()}
+
+
+_SCAM_KEYWORDS = frozenset({"urgent", "pay", "verify", "block", "expired", "kyc", "winner", "prize", "otp"})
+# Stdlib re on purpose: [a-z]+ cannot backtrack, so RE2 buys no safety here,
+# and its findall is ~30x slower per call on short messages.
+_WORD_RE = re.compile(r'[a-z]+')
 
 
 def get_scam_score(text: str):
-    scam_keywords = ["urgent", "pay", "verify", "block", "expired", "kyc", "winner", "prize", "otp"]
-    score = 10
-    for word in scam_keywords:
-        if word in text.lower(): score += 20
-    return min(score, 95)
+    # Whole-word matching: "payment" should not count as "pay".
+    hits = _SCAM_KEYWORDS.intersection(_WORD_RE.findall(text.lower()))
+    return min(10 + 20 * len(hits), 95)
 
 
 def analyze_frustration(text: str, metadata: dict):
@@ -93,15 +206,79 @@ def analyze_frustration(text: str, metadata: dict):
 
 
 # --- 5. MAIN EXPORT FUNCTION ---
-def process_message(user_text: str, history: List[str], metadata: dict = None):
+# Telegram's own message limit, and far above an SMS. Scoring runs on the
+# event loop, so every scorer sees at most this much of a message; the worst
+# case at this length is a few milliseconds.
+MAX_MESSAGE_LENGTH = 4096
+
+
+def analyze_message(user_text: str, metadata: dict = None):
+    """Run the deterministic utilities; cheap enough to finish before the LLM replies."""
     if metadata is None: metadata = {}
+    user_text = user_text[:MAX_MESSAGE_LENGTH]
+
+    intel = extract_intelligence(user_text)
+    score = get_scam_score(user_text)
+    frustration = analyze_frustration(user_text, metadata)
 
+    return score, intel, frustration
+
+
+def process_message(user_text: str, history: List[str], metadata: dict = None):
     # Run Agent
     bot_reply = agent.forward(history=history, latest_message=user_text)
 
     # Run Utilities
-    intel = extract_intelligence(user_text)
-    score = get_scam_score(user_text)
-    frustration = analyze_frustration(user_text, metadata)
+    score, intel, frustration = analyze_message(user_text, metadata)
+
+    return bot_reply, score, intel, frustration
+
+
+async def aprocess_message(user_text: str, history: List[str], metadata: dict = None):
+    # Run Utilities first so they are not held up behind the Groq call
+    score, intel, frustration = analyze_message(user_text, metadata)
+
+    # Run Agent without blocking the event loop
+    bot_reply = await agent.aforward(history=history, latest_message=user_text)
+
+    return bot_reply, score, intel, frustration
+
+
+# --- 6. SESSION STATE ---
+TAKEOVER_SCORE = 50
+
+
+@dataclass(slots=True)
+class ThreatSession:
+    """What a bridge remembers about a sender it has taken over."""
+    history: List[str] = field(default_factory=list)
+    is_engaged: bool = True
+
+
+async def engage_sender(sessions: dict, sender_id: str, text: str, metadata: dict = None):
+    """Shared engagement flow for the chat bridges.
+
+    Known scammers get a reply; anyone else is scored silently and taken over
+    only if the message looks like a scam. Returns the process_message tuple,
+    or None when the message should be ignored.
+
+    Bridges get no keystroke telemetry, so each passes one module-level
+    metadata dict for every message instead of building one per message.
+    """
+    # Bounded before the takeover filter, so the filter, the stored history
+    # and the reply all see the same text as analyze_message.
+    text = text[:MAX_MESSAGE_LENGTH]
+    threat = sessions.get(sender_id)
+    if not (threat and threat.is_engaged):
+        current_score = get_scam_score(text)
+        if current_score < TAKEOVER_SCORE:
+            return None
+
+        print(f"\n⚠️ HIGH THREAT DETECTED ({current_score}). AUTONOMOUS TAKEOVER INITIATED FOR {sender_id}...")
+        threat = sessions[sender_id] = ThreatSession()
+
+    result = await aprocess_message(text, threat.history, metadata)
 
-    return bot_reply, score, intel, frustration
\ No newline at end of file
+    threat.history.append(f"Scammer: {text}")
+    threat.history.append(f"Ramachandran: {result[0]}")
+    return result
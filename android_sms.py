@@ -1,18 +1,28 @@
 import os
 import logging
+import orjson
 import uvicorn
-import json
 from fastapi import FastAPI, Request, BackgroundTasks
-from agent import process_message, get_scam_score
+from agent import engage_sender, warm_up
+from web import OrjsonResponse, warm_up_lifespan
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+DEBUG = os.environ.get("HONEYPOT_DEBUG") == "1"
+logging.basicConfig(level=logging.DEBUG if DEBUG else logging.WARNING, format='%(asctime)s - %(message)s')
 logger = logging.getLogger("Android-SMS-Bridge")
 
-app = FastAPI(title="Project Grandpa - Android SMS Bridge")
+
+app = FastAPI(
+    title="Project Grandpa - Android SMS Bridge",
+    default_response_class=OrjsonResponse,
+    lifespan=warm_up_lifespan(warm_up),
+)
 
 # --- MEMORY DATABASE ---
 active_threats = {}
 
+# Typing profile for engage_sender; SMS apps report no typing speed.
+TYPING_METADATA = {"wpm": 30, "backspaces": 0}
+
 
 def log_threat_intelligence(sender_id: str, intel: dict, score: int, frustration: int):
     if score < 10: return
@@ -23,14 +33,15 @@ def log_threat_intelligence(sender_id: str, intel: dict, score: int, frustration
 async def android_sms_webhook(request: Request, background_tasks: BackgroundTasks):
     # --- SAFETY NET: Read raw bytes first ---
     raw_body = await request.body()
-    body_str = raw_body.decode('utf-8')
 
-    # Print the raw text to your terminal so you can verify the JSON syntax
-    print(f"\nDEBUG: Received raw payload: {body_str}")
+    # Run with HONEYPOT_DEBUG=1 to see the raw payload and verify the JSON syntax.
+    # Lazy formatting: the bytes are only rendered when DEBUG is enabled, and
+    # only the head of an oversized body is logged.
+    logger.debug("Received raw payload: %s", raw_body[:2048])
 
     try:
-        data = json.loads(body_str)
-    except json.JSONDecodeError as e:
+        data = orjson.loads(raw_body)
+    except orjson.JSONDecodeError as e:
         print(f"❌ CRITICAL ERROR: Received invalid JSON! Error: {e}")
         # Return a helpful error to the terminal, but keep the server alive
         return {"status": "error", "message": "Invalid JSON format"}
@@ -43,35 +54,17 @@ async def android_sms_webhook(request: Request, background_tasks: BackgroundTask
         print("❌ Warning: Missing 'sender' or 'text' in JSON")
         return {"status": "error", "message": "Missing fields"}
 
-    logger.info(f"Incoming SMS from {sender_number}: {incoming_text}")
-
-    # 1. Engage with known threats
-    if sender_number in active_threats and active_threats[sender_number]["is_engaged"]:
-        history = active_threats[sender_number]["history"]
-        bot_reply, score, intel, frustration = process_message(
-            incoming_text, history, metadata={"wpm": 30, "backspaces": 0}
-        )
-        history.append(f"Scammer: {incoming_text}")
-        history.append(f"Ramachandran: {bot_reply}")
-        active_threats[sender_number]["history"] = history
-        return {"action": "reply", "reply_message": bot_reply}
-
-    # 2. Run threat filter
-    current_score = get_scam_score(incoming_text)
+    logger.debug("Incoming SMS from %s: %s", sender_number, incoming_text)
 
-    if current_score >= 50:
-        print(f"\n⚠️ HIGH THREAT ({current_score}). TAKEOVER INITIATED...")
-        active_threats[sender_number] = {"history": [], "is_engaged": True}
-        bot_reply, score, intel, frustration = process_message(
-            incoming_text, [], metadata={"wpm": 30, "backspaces": 0}
-        )
-        active_threats[sender_number]["history"].append(f"Scammer: {incoming_text}")
-        active_threats[sender_number]["history"].append(f"Ramachandran: {bot_reply}")
-        return {"action": "reply", "reply_message": bot_reply}
+    # Engage with known threats, or run the threat filter on new senders
+    result = await engage_sender(active_threats, sender_number, incoming_text, TYPING_METADATA)
+    if result is None:
+        return {"action": "ignore", "reply_message": ""}
 
-    return {"action": "ignore", "reply_message": ""}
+    bot_reply, score, intel, frustration = result
+    return {"action": "reply", "reply_message": bot_reply}
 
 
 if __name__ == "__main__":
     print("\n🛡️ Android SMS Bridge Armed and Listening...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, access_log=False)
\ No newline at end of file
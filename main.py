@@ -1,17 +1,29 @@
 import os
-import time
 import logging
+import orjson
 import uvicorn
-from fastapi import FastAPI, Request, BackgroundTasks
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, Response, BackgroundTasks
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from web import OrjsonResponse, warm_up_lifespan
 
 load_dotenv()
-logging.basicConfig(level=logging.INFO)
+DEBUG = os.environ.get("HONEYPOT_DEBUG") == "1"
+logging.basicConfig(level=logging.DEBUG if DEBUG else logging.WARNING)
 logger = logging.getLogger("Honeypot-Project")
 
-app = FastAPI(title="Project Grandpa - Autonomous Honeypot API")
+try:
+    from agent import agent, aprocess_message, analyze_message, warm_up
+    AGENT_ACTIVE = True
+except ImportError:
+    AGENT_ACTIVE = False
+
+app = FastAPI(
+    title="Project Grandpa - Autonomous Honeypot API",
+    default_response_class=OrjsonResponse,
+    lifespan=warm_up_lifespan(warm_up if AGENT_ACTIVE else None),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,40 +33,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-try:
-    from agent import process_message
-    AGENT_ACTIVE = True
-except ImportError:
-    AGENT_ACTIVE = False
-
-def log_threat_intelligence(session_id: str, intel: dict, score: int, frustration: int):
+async def log_threat_intelligence(session_id: str, intel: dict, score: int, frustration: int):
     if score < 10: return
     logger.warning("="*50)
     logger.warning("🚨 THREAT INTEL & PSYCHOLOGICAL PROFILE 🚨")
-    logger.warning(f"Scam Score: {score}/100 | Frustration Index: {frustration}/100")
-    logger.warning(f"Extracted: {intel}")
+    logger.warning("Scam Score: %s/100 | Frustration Index: %s/100", score, frustration)
+    logger.warning("Extracted: %s", intel)
     logger.warning("="*50)
 
-@app.post("/analyze")
-async def analyze_ep(request: Request, background_tasks: BackgroundTasks):
+async def read_json(request: Request):
+    raw = await request.body()
     try:
-        data = await request.json()
-    except:
-        data = {}
+        return orjson.loads(raw) if raw else {}
+    except orjson.JSONDecodeError:
+        return {}
+
+# Used when a client sends no keystroke telemetry; shared, never mutated.
+DEFAULT_TYPING_METADATA = {"wpm": 0, "backspaces": 0}
+
+# Reported when the agent is unavailable or fails; tuples serialise as empty arrays.
+EMPTY_INTEL = {"upiIds": (), "phishingLinks": (), "phoneNumbers": ()}
+
+async def read_request(request: Request):
+    data = await read_json(request)
 
     user_text = data.get("text", "Hello")
-    metadata = data.get("typing_metadata", {"wpm": 0, "backspaces": 0})
+    metadata = data.get("typing_metadata", DEFAULT_TYPING_METADATA)
     session_id = data.get("session_id", "class_demo_session")
+    return user_text, metadata, session_id
+
+@app.post("/analyze")
+async def analyze_ep(request: Request, background_tasks: BackgroundTasks):
+    user_text, metadata, session_id = await read_request(request)
 
     bot_reply = "I am confused."
     score, frustration = 0, 0
-    intel = {"upiIds": [], "phishingLinks": [], "phoneNumbers": []}
+    intel = EMPTY_INTEL
 
     if AGENT_ACTIVE:
         try:
-            bot_reply, score, intel, frustration = process_message(user_text, [], metadata)
+            bot_reply, score, intel, frustration = await aprocess_message(user_text, [], metadata)
         except Exception as e:
-            logger.error(f"Agent Error: {e}")
+            logger.error("Agent Error: %s", e)
 
     background_tasks.add_task(log_threat_intelligence, session_id, intel, score, frustration)
 
@@ -67,13 +87,119 @@ async def analyze_ep(request: Request, background_tasks: BackgroundTasks):
         "frustrationIndex": frustration
     }
 
+def sse_event(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+@app.post("/analyze/stream")
+async def analyze_stream_ep(request: Request, background_tasks: BackgroundTasks):
+    """Same analysis as /analyze, but the reply streams as server-sent events.
+
+    The 'analysis' event goes out straight away, followed by a 'reply' event per
+    chunk from the LLM and a final 'done' event.
+    """
+    user_text, metadata, session_id = await read_request(request)
+
+    score, frustration = 0, 0
+    intel = EMPTY_INTEL
+
+    if AGENT_ACTIVE:
+        try:
+            score, intel, frustration = analyze_message(user_text, metadata)
+        except Exception as e:
+            logger.error("Agent Error: %s", e)
+
+    background_tasks.add_task(log_threat_intelligence, session_id, intel, score, frustration)
+
+    async def events():
+        yield sse_event("analysis", {
+            "scamDetected": score > 50,
+            "scamScore": score,
+            "extractedIntelligence": intel,
+            "frustrationIndex": frustration
+        })
+        if AGENT_ACTIVE:
+            async for chunk in agent.astream([], user_text):
+                yield sse_event("reply", chunk)
+        else:
+            yield sse_event("reply", "I am confused.")
+        yield sse_event("done", {"status": "success"})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+# analyze_message bounds each text to MAX_MESSAGE_LENGTH, where the worst case
+# is ~7 ms of intel scanning, so a full batch holds the loop for ~0.2 s at most.
+MAX_BATCH_TEXTS = 32
+
+def batch_error(status_code: int, message: str):
+    return OrjsonResponse(status_code=status_code, content={"status": "error", "message": message})
+
+@app.post("/analyze/batch")
+async def analyze_batch_ep(request: Request):
+    """Score a batch of messages for load tests and triage.
+
+    Only the deterministic checks run; no LLM reply is generated, so a batch
+    is not throttled by the Groq rate limit.
+    """
+    data = await read_json(request)
+    texts = data.get("texts", []) if isinstance(data, dict) else None
+
+    # Scoring runs inline on the event loop, so the number of texts is capped
+    # to bound how long one request can hold it.
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return batch_error(422, "'texts' must be a list of strings")
+    if len(texts) > MAX_BATCH_TEXTS:
+        return batch_error(413, f"At most {MAX_BATCH_TEXTS} texts per batch")
+
+    results = []
+    for text in texts:
+        score, frustration = 0, 0
+        intel = EMPTY_INTEL
+
+        if AGENT_ACTIVE:
+            try:
+                score, intel, frustration = analyze_message(text)
+            except Exception as e:
+                logger.error("Agent Error: %s", e)
+
+        results.append({
+            "scamDetected": score > 50,
+            "scamScore": score,
+            "extractedIntelligence": intel,
+            "frustrationIndex": frustration
+        })
+
+    return {"status": "success", "results": results}
+
+# The demo UI and probe bodies never change while the server runs, so they are
+# read and serialised once at import instead of on every hit.
+try:
+    with open("index.html", "rb") as file:
+        INDEX_HTML = file.read()
+except FileNotFoundError:
+    INDEX_HTML = None
+
+HEALTH_BODY = orjson.dumps({"status": "healthy"})
+UI_NOT_FOUND_BODY = orjson.dumps({"status": "UI not found."})
+
+@app.get("/health")
+async def health():
+    return Response(content=HEALTH_BODY, media_type="application/json")
+
 @app.get("/")
 async def root():
-    try:
-        with open("index.html", "r", encoding="utf-8") as file:
-            return HTMLResponse(content=file.read(), status_code=200)
-    except FileNotFoundError:
-        return {"status": "UI not found."}
+    if INDEX_HTML is None:
+        return Response(content=UI_NOT_FOUND_BODY, media_type="application/json")
+    return HTMLResponse(content=INDEX_HTML, status_code=200)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
\ No newline at end of file
+    # One worker unless WEB_CONCURRENCY says otherwise: each worker loads DSPy
+    # (~120 MB RSS) and fires its own Groq warm-up, and os.cpu_count() reports
+    # the host's cores rather than a container's quota. Workers share DSPy's
+    # disk cache but each keeps its own in-memory layer.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 8000)),
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        access_log=False,
+    )
\ No newline at end of file
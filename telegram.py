@@ -4,11 +4,12 @@ from telethon import TelegramClient, events
 from dotenv import load_dotenv
 
 # Import our AI brain
-from agent import process_message, get_scam_score
+from agent import engage_sender
 
 # --- 1. SETUP ---
 load_dotenv()
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+DEBUG = os.environ.get("HONEYPOT_DEBUG") == "1"
+logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger("Telegram-Honeypot")
 
 API_ID = os.environ.get("TELEGRAM_API_ID")
@@ -24,6 +25,9 @@ client = TelegramClient('grandpa_session', API_ID, API_HASH)
 # --- 2. THREAT DATABASE ---
 active_threats = {}
 
+# Typing profile for engage_sender; Telegram reports no keystrokes.
+TYPING_METADATA = {"wpm": 35, "backspaces": 0}
+
 
 def log_threat_intelligence(sender_id: str, intel: dict, score: int, frustration: int):
     if score < 10: return
@@ -47,46 +51,17 @@ async def invisible_interceptor(event):
     sender_id = str(sender.id)
     incoming_text = event.raw_text
 
-    # 1. Is this a known scammer we are already fighting?
-    if sender_id in active_threats and active_threats[sender_id]["is_engaged"]:
-        history = active_threats[sender_id]["history"]
-
-        bot_reply, score, intel, frustration = process_message(
-            incoming_text, history, metadata={"wpm": 35, "backspaces": 0}
-        )
-
-        history.append(f"Scammer: {incoming_text}")
-        history.append(f"Ramachandran: {bot_reply}")
-        active_threats[sender_id]["history"] = history
-
-        log_threat_intelligence(sender_id, intel, score, frustration)
-
-        # Grandpa replies autonomously!
-        await event.reply(bot_reply)
+    # Known scammers get a reply; everyone else passes the math filter silently
+    result = await engage_sender(active_threats, sender_id, incoming_text, TYPING_METADATA)
+    if result is None:
+        # Not a threat, stay completely invisible.
         return
 
-    # 2. Monitor mode: Run the math filter silently
-    current_score = get_scam_score(incoming_text)
+    bot_reply, score, intel, frustration = result
+    log_threat_intelligence(sender_id, intel, score, frustration)
 
-    if current_score >= 50:
-        print(f"\n⚠️ HIGH THREAT DETECTED ({current_score}). AUTONOMOUS TAKEOVER INITIATED FOR {sender_id}...")
-
-        active_threats[sender_id] = {"history": [], "is_engaged": True}
-
-        bot_reply, score, intel, frustration = process_message(
-            incoming_text, [], metadata={"wpm": 35, "backspaces": 0}
-        )
-
-        active_threats[sender_id]["history"].append(f"Scammer: {incoming_text}")
-        active_threats[sender_id]["history"].append(f"Ramachandran: {bot_reply}")
-
-        log_threat_intelligence(sender_id, intel, score, frustration)
-
-        # Fire back at the scammer
-        await event.reply(bot_reply)
-    else:
-        # Not a threat, stay completely invisible.
-        pass
+    # Grandpa replies autonomously!
+    await event.reply(bot_reply)
 
 
 # --- 4. LAUNCH ---
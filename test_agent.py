@@ -0,0 +1,53 @@
+import importlib
+import sys
+import time
+
+import pytest
+
+
+@pytest.fixture(params=["re2", "re"])
+def agent(request, monkeypatch):
+    """The agent module compiled against RE2 and against the stdlib fallback."""
+    if request.param == "re2":
+        pytest.importorskip("re2")
+    else:
+        monkeypatch.setitem(sys.modules, "re2", None)
+    import agent as module
+    yield importlib.reload(module)
+    monkeypatch.undo()
+    importlib.reload(module)
+
+
+@pytest.mark.parametrize("text", [
+    "a" * 16000 + "@",
+    "a@" * 8000,
+    "http://" + "%AA" * 100000,
+    "http://" + "a" * 100000,
+    "9" * 100000,
+    "https://" * 5000,
+    "a " * 5_000_000,
+], ids=["upi-run", "upi-repeat", "percent-url", "long-url", "digit-run", "scheme-repeat", "word-flood"])
+def test_pathological_input_is_fast(agent, text):
+    start = time.perf_counter()
+    agent.analyze_message(text)
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.parametrize("text, score", [
+    ("Hello, how are you?", 10),
+    ("URGENT: your KYC has expired, pay now to verify.", 95),
+    ("Your OTP is 1234", 30),
+    ("Payment received for the blocked prizes", 10),
+])
+def test_scam_score_counts_whole_keywords(agent, text, score):
+    assert agent.analyze_message(text)[0] == score
+
+
+@pytest.mark.parametrize("url", ["https://exämple.com", "https://paytm-kyc.рф"])
+def test_unicode_hosts_are_kept_whole(agent, url):
+    assert agent.extract_intelligence(f"click {url} now")["phishingLinks"] == [url]
+
+
+def test_upi_ids_survive_overlapping_links_and_phones(agent):
+    assert agent.extract_intelligence("pay +919876543210@ybl")["upiIds"] == ["919876543210@ybl"]
+    assert agent.extract_intelligence("https://verify@paytm.in")["upiIds"] == ["verify@paytm"]
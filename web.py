@@ -0,0 +1,27 @@
+import asyncio
+import orjson
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+# --- Shared by the HTTP API (main.py) and the Android SMS bridge ---
+class OrjsonResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def warm_up_lifespan(warm_up=None):
+    """Build a lifespan that starts warm_up in the background, if given.
+
+    Startup never waits on Groq, so /health and the webhooks answer right away.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # app.state holds the reference that keeps the task from being collected.
+        app.state.warm_up_task = asyncio.create_task(warm_up()) if warm_up else None
+        yield
+        if app.state.warm_up_task is not None:
+            app.state.warm_up_task.cancel()
+
+    return lifespan